@@ -0,0 +1,27 @@
+"""Add sha256 column to File table
+
+Revision ID: 3f9a6b0c5e21
+Revises: 8c41d2e7a9b3
+Create Date: 2026-10-14 10:03:17.884512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6b0c5e21'
+down_revision: Union[str, None] = '8c41d2e7a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('files', sa.Column('sha256', sa.String(64), nullable=True))
+    op.create_index(op.f('ix_files_sha256'), 'files', ['sha256'])
+
+def downgrade():
+    op.drop_index(op.f('ix_files_sha256'), table_name='files')
+    op.drop_column('files', 'sha256')
@@ -0,0 +1,38 @@
+"""Add created_at column to File table
+
+Revision ID: 8c41d2e7a9b3
+Revises: 25e76803f263
+Create Date: 2026-10-14 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d2e7a9b3'
+down_revision: Union[str, None] = '25e76803f263'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('files',
+               sa.Column('created_at', sa.DateTime(timezone=True),
+                         server_default=sa.func.now(), nullable=False))
+    # Existing rows were just stamped with the migration time; date them by
+    # the YYYYmmdd-HHMMSS prefix of their stored file name instead. The
+    # prefix was written in the API host's local time, read here in the
+    # database session's time zone.
+    op.execute(r"""
+        UPDATE files
+        SET created_at = to_timestamp(substring(path from '^files/(\d{8}-\d{6})_'), 'YYYYMMDD-HH24MISS')
+        WHERE path ~ '^files/\d{8}-\d{6}_'
+    """)
+    op.create_index(op.f('ix_files_created_at'), 'files', ['created_at'])
+
+def downgrade():
+    op.drop_index(op.f('ix_files_created_at'), table_name='files')
+    op.drop_column('files', 'created_at')
@@ -0,0 +1,25 @@
+"""Drop salt column from User table
+
+Revision ID: b72e4f19d8a6
+Revises: 3f9a6b0c5e21
+Create Date: 2026-10-14 14:26:05.347190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b72e4f19d8a6'
+down_revision: Union[str, None] = '3f9a6b0c5e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.drop_column('users', 'salt')
+
+def downgrade():
+    op.add_column('users', sa.Column('salt', sa.String(), nullable=True))
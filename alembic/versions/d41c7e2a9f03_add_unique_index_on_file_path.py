@@ -0,0 +1,25 @@
+"""Add unique index on path column of File table
+
+Revision ID: d41c7e2a9f03
+Revises: b72e4f19d8a6
+Create Date: 2026-10-14 15:02:41.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7e2a9f03'
+down_revision: Union[str, None] = 'b72e4f19d8a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_files_path'), 'files', ['path'], unique=True)
+
+def downgrade():
+    op.drop_index(op.f('ix_files_path'), table_name='files')
@@ -1,30 +1,33 @@
 # fastapi imports
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from typing import Union, Annotated
 
 # database imports
 from sqlalchemy.orm import Session
 from database import crud, models, schemas
 from database.database import SessionLocal, engine
-from pydantic import BaseModel
-
-# apscheduler imports
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from app.schedulers import scheduler
-from app.schedulers import startup_event
-from app.schedulers import shutdown_event
+from pydantic import BaseModel, TypeAdapter
 
 # other imports
+import asyncio
 import json
 import datetime, os
-from app.queue import file_queue
+import hashlib
+import uuid
+from app.queue import enqueue_file, startup_event, shutdown_event
+from app.storage import FILES_DIR, save_upload, remove_file
+
+# The schema is managed by Alembic; create_all is only a shortcut for local development
+if os.getenv("DEV_CREATE_ALL"):
+    models.Base.metadata.create_all(bind=engine)
 
-models.Base.metadata.create_all(bind=engine)
+os.makedirs(FILES_DIR, exist_ok=True)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_event_handler('startup', startup_event)
 app.add_event_handler('shutdown', shutdown_event)
 
@@ -36,20 +39,34 @@ def get_db():
     finally:
         db.close()
 
-# CORS
-origins = [
-    "http://localhost",
-    "http://localhost:8080",
-]
-
+# CORS: localhost on any port, matched with one precompiled regex
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origin_regex=r"^http://localhost(:\d+)?$",
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["content-type", "authorization"],
 )
 
+# Timestamp prefix for stored file names (YYYYmmdd-HHMMSS, UTC), built
+# without strftime's format parsing since it runs on every upload
+def _ts(now: datetime.datetime | None = None) -> str:
+    n = now or datetime.datetime.now(datetime.timezone.utc)
+    return f"{n.year:04d}{n.month:02d}{n.day:02d}-{n.hour:02d}{n.minute:02d}{n.second:02d}"
+
+# Strong ETag for a response body
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+# Serializers for list responses, built once instead of on every request
+files_adapter = TypeAdapter(list[schemas.File])
+users_adapter = TypeAdapter(list[schemas.User])
+items_adapter = TypeAdapter(list[schemas.Item])
+
+# Validate ORM rows against a list schema and serialize them straight to JSON bytes
+def dump_rows(adapter: TypeAdapter, rows) -> bytes:
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
 # test item class
 class Item(BaseModel):
     name: str
@@ -108,35 +125,48 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
     Raises:
     - HTTPException: If the file upload fails.
     """
-    contents = await file.read()
+    # The uuid keeps same-named uploads within one second from sharing a path
+    file_path = f'{FILES_DIR}/{_ts()}_{uuid.uuid4().hex}_{file.filename}'
+
+    sha256 = await run_in_threadpool(save_upload, file.file, file_path)
+
     metadata = {
         "filename": file.filename,
         "content_type": file.content_type,
-        "file_size": file.size,
-        "file_headers": file.headers,
-        "file_extension": file.filename.split(".")[-1],
-        "file_size_kb": file.size / 1024,
-        "contents": contents,
+        "size": file.size,
+        "path": file_path,
+        "sha256": sha256,
     }
 
-    file_queue.put(metadata)
+    await enqueue_file(metadata)
     
     return {"filename": file.filename, "status": "File added to upload queue"}
 
 # Retrieve all files
-@app.get("/files")
-def get_all_files(db: Session = Depends(get_db)):
+@app.get("/files", response_model=list[schemas.File])
+def get_all_files(request: Request, skip: int = 0, limit: int = Query(100, le=1000), db: Session = Depends(get_db)):
     """
-    Retrieve all files from the database.
+    Retrieve a page of files from the database.
+
+    The response carries an ETag; a request whose If-None-Match matches it
+    gets an empty 304 response instead of the list.
 
     Parameters:
+        - request (Request): The incoming request.
+        - skip (int): The number of files to skip.
+        - limit (int): The maximum number of files to retrieve (at most 1000).
         - db (Session): The database session.
 
     Returns:
         list: A list of files.
     """
-    files = crud.get_all_files(db)
-    return files
+    files = crud.get_all_files(db, skip=skip, limit=limit)
+    body = dump_rows(files_adapter, files)
+    etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": "max-age=5"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Retrieve a file by its ID
 @app.get("/files/{file_id}")
@@ -160,6 +190,31 @@ def get_file(file_id: str, db: Session = Depends(get_db)):
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
+# Download a file by its ID
+@app.get("/files/{file_id}/download")
+def download_file(file_id: str, db: Session = Depends(get_db)):
+    """
+    Download the contents of a file by its ID.
+
+    The bytes are sent with FileResponse, which uses sendfile where the
+    server supports it, so they are never read into Python.
+
+    Parameters:
+        - file_id (str): The ID of the file to download.
+        - db (Session): The database session.
+
+    Returns:
+        FileResponse: The file contents as an attachment.
+
+    Raises:
+        HTTPException: If the file is not found, or its row has no file on disk.
+    """
+    file = crud.get_file(db, file_id)
+    if file and os.path.isfile(file.path):
+        return FileResponse(file.path, filename=file.filename, media_type="application/octet-stream")
+    else:
+        raise HTTPException(status_code=404, detail="File not found")
+
 # Delete a file by its ID
 @app.delete("/files/{file_id}")
 def delete_file(file_id: str, db: Session = Depends(get_db)):
@@ -176,21 +231,16 @@ def delete_file(file_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the file is not found.
     """
-    file = crud.get_file(db, file_id)
-    if file:
-        file_path = file.path
-        crud.delete_file(db, file_id)
-        try:
-            os.remove(file_path)
-        except OSError:
-            pass
+    file_path = crud.delete_file(db, file_id)
+    if file_path is not None:
+        remove_file(file_path)
         return {"message": "File deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
 # Delete multiple files
 @app.delete("/files/")
-def delete_multiple_files(files: list[str], db: Session = Depends(get_db)):
+async def delete_multiple_files(files: list[str], db: Session = Depends(get_db)):
     """
     Delete multiple files.
 
@@ -201,16 +251,14 @@ def delete_multiple_files(files: list[str], db: Session = Depends(get_db)):
     Returns:
         list: A list of json responses indicating the success of each deletion.
     """
+    # One DELETE ... RETURNING for the whole batch instead of two queries per file
+    file_paths = dict(await run_in_threadpool(crud.delete_files, db, files))
+    # Overlap the unlinks instead of paying for each syscall in turn
+    await asyncio.gather(*(run_in_threadpool(remove_file, path) for path in file_paths.values()))
+
     response = []
     for file_id in files:
-        file = crud.get_file(db, file_id)
-        if file:
-            file_path = file.path
-            crud.delete_file(db, file_id)
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
+        if file_paths.pop(file_id, None) is not None:
             response.append({file_id: "File deleted successfully"})
         else:
             response.append({file_id: "File not found"})
@@ -255,7 +303,7 @@ def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
         list: A list of users.
     """
     users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+    return Response(content=dump_rows(users_adapter, users), media_type="application/json")
 
 # Retrieve a user by its ID
 @app.get("/users/{user_id}", response_model=schemas.User)
@@ -317,4 +365,4 @@ def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
         list: A list of items.
     """
     items = crud.get_items(db, skip=skip, limit=limit)
-    return items
+    return Response(content=dump_rows(items_adapter, items), media_type="application/json")
@@ -1,3 +1,92 @@
-from queue import Queue
+# database imports
+from database.database import SessionLocal
+from database import crud
 
-file_queue = Queue()
\ No newline at end of file
+# other imports
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from app.storage import link_duplicate
+
+# Uploads waiting to be recorded in the database. Only touched from the event
+# loop, so it doesn't need the locking of queue.Queue; a full queue makes
+# producers wait instead of growing without bound. Replaced on every startup,
+# since an asyncio.Queue stays tied to the loop that first waited on it.
+QUEUE_SIZE = 1024
+file_queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+# Largest number of uploads recorded with a single INSERT
+MAX_BATCH = 64
+# How long the consumer waits for more uploads to join a batch, in seconds
+BATCH_WINDOW = 0.2
+
+consumer_task = None
+
+# Queue an upload to be recorded by the consumer
+async def enqueue_file(metadata):
+    await file_queue.put(metadata)
+
+# Record a batch of uploaded files, sharing the bytes of identical uploads
+def store_files(db, batch):
+    known_paths = dict(crud.get_paths_by_sha256(db, [metadata["sha256"] for metadata in batch]))
+    for metadata in batch:
+        existing_path = known_paths.setdefault(metadata["sha256"], metadata["path"])
+        if existing_path != metadata["path"]:
+            link_duplicate(existing_path, metadata["path"])
+    return crud.create_files(db, [
+        {"filename": metadata["filename"], "path": metadata["path"], "sha256": metadata["sha256"]}
+        for metadata in batch
+    ])
+
+# Record a batch in its own transaction: one INSERT and one commit
+def record_batch(batch):
+    with SessionLocal.begin() as db:
+        file_ids = store_files(db, batch)
+    for metadata in batch:
+        if metadata["path"] not in file_ids:
+            print(f"Skipped file {metadata['filename']}: {metadata['path']} is already recorded")
+            continue
+        metadata["file_id"] = file_ids[metadata["path"]]
+        print(f"Uploaded file {metadata['filename']} (ID: {metadata['file_id']})")
+
+# Wait for the next upload, then give others up to BATCH_WINDOW to join it.
+# Stops early at the None that shutdown_event queues.
+async def next_batch():
+    loop = asyncio.get_running_loop()
+    batch = [await file_queue.get()]
+    deadline = loop.time() + BATCH_WINDOW
+    while len(batch) < MAX_BATCH and batch[-1] is not None:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(file_queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+# Background task that records uploads shortly after they are queued,
+# until it reaches the None queued by shutdown_event
+async def consume_file_queue():
+    while True:
+        batch = await next_batch()
+        stopping = batch[-1] is None
+        if stopping:
+            batch.pop()
+        if batch:
+            try:
+                await run_in_threadpool(record_batch, batch)
+            except Exception as exc:
+                print(f"Failed to record {len(batch)} uploaded files: {exc}")
+        if stopping:
+            return
+
+# Function to run at startup
+async def startup_event():
+    global file_queue, consumer_task
+    file_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    consumer_task = asyncio.create_task(consume_file_queue())
+
+# Function to run at shutdown: let the consumer record what is already queued
+async def shutdown_event():
+    await file_queue.put(None)
+    await consumer_task
@@ -0,0 +1,59 @@
+# File storage helpers shared by the endpoints and the scheduler jobs.
+# These block on disk I/O, so callers on the event loop must run them
+# in the threadpool.
+import hashlib
+import os
+
+# Directory uploads are stored in, relative to the working directory
+FILES_DIR = "files"
+
+# Size of the chunks used to stream uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Stream an upload to disk in fixed-size chunks so memory stays bounded,
+# hashing it along the way. Returns the SHA-256 hex digest of the contents.
+# Fails with FileExistsError rather than overwrite another upload's bytes.
+def save_upload(src, file_path: str):
+    digest = hashlib.sha256()
+    with open(file_path, "xb") as f:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+# Replace file_path with a hard link to existing_path so identical uploads
+# share their bytes on disk while keeping their own path. Leaves file_path
+# untouched if the link can't be made (e.g. the original was just deleted).
+# The shared inode is touched before the link takes file_path's place: the
+# link would otherwise carry the original's old mtime, and the orphan sweep
+# could remove it before the new row is committed.
+def link_duplicate(existing_path: str, file_path: str):
+    tmp_path = f"{file_path}.tmp"
+    try:
+        os.link(existing_path, tmp_path)
+        os.utime(tmp_path)
+        os.replace(tmp_path, file_path)
+    except OSError:
+        remove_file(tmp_path)
+        return False
+    return True
+
+# Remove a file from disk, ignoring files that are already gone
+def remove_file(file_path: str):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+# Paths of the files in FILES_DIR last modified before cutoff (a Unix timestamp).
+# A missing FILES_DIR (nothing uploaded yet) has no files to report.
+def find_files_older_than(cutoff: float):
+    try:
+        entries = os.scandir(FILES_DIR)
+    except FileNotFoundError:
+        return []
+    with entries:
+        return [
+            entry.path for entry in entries
+            if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff
+        ]
@@ -1,4 +1,7 @@
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from datetime import datetime
 
 from . import models, schemas
 import bcrypt
@@ -17,28 +20,19 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
 
+# bcrypt is deliberately slow; create_user is only called from sync endpoints,
+# which FastAPI already runs in its threadpool. The salt is embedded in the hash.
 def create_user(db: Session, user: schemas.UserCreate):
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(bytes(user.password, "utf-8"), salt)
-    db_user = models.User(email=user.email, hashed_password=hashed_password, salt=salt)
+    hashed_password = bcrypt.hashpw(bytes(user.password, "utf-8"), bcrypt.gensalt()).decode("utf-8")
+    db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int):
-    db.query(models.User).filter(models.User.id == user_id).delete()
-    db.commit()
-    return True
-
 def get_items(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Item).offset(skip).limit(limit).all()
 
-def delete_item(db: Session, item_id: int):
-    db.query(models.Item).filter(models.Item.id == item_id).delete()
-    db.commit()
-    return True
-
 def create_user_item(db: Session, item: schemas.ItemCreate, user_id: int):
     db_item = models.Item(**item.dict(), owner_id=user_id)
     db.add(db_item)
@@ -46,22 +40,63 @@ def create_user_item(db: Session, item: schemas.ItemCreate, user_id: int):
     db.refresh(db_item)
     return db_item
 
+# Delete every row of model past the first `keep` ids, inside the database.
+# Leaves the commit to the caller's transaction.
+def trim_table(db: Session, model, keep: int = 10):
+    excess_ids = select(model.id).order_by(model.id).offset(keep).scalar_subquery()
+    db.execute(delete(model).where(model.id.in_(excess_ids)))
+    return True
+
+# Delete the items owned by users past the first `keep` ids, so trimming
+# users afterwards doesn't trip the items.owner_id foreign key.
+# Leaves the commit to the caller's transaction.
+def delete_items_of_excess_users(db: Session, keep: int = 10):
+    excess_user_ids = select(models.User.id).order_by(models.User.id).offset(keep).scalar_subquery()
+    db.execute(delete(models.Item).where(models.Item.owner_id.in_(excess_user_ids)))
+
 # =========== FILES ===========
 
-def create_file(db: Session, filename: str, path: str):
-    db_file = models.File(filename=filename, path=path)
-    db.add(db_file)
-    db.commit()
-    db.refresh(db_file)
-    return db_file
+# INSERT into files that skips rows whose path is already recorded. Every
+# upload gets its own path, so a conflict only comes from a retried batch.
+# SQLite (used for local development and tests) has the same
+# ON CONFLICT DO NOTHING clause.
+def insert_files_skipping_known_paths(db: Session):
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(models.File).on_conflict_do_nothing(index_elements=["path"])
 
-def get_all_files(db: Session):
-    return db.query(models.File).all()
+def get_all_files(db: Session, skip: int = 0, limit: int = 100):
+    return db.query(models.File).order_by(models.File.id).offset(skip).limit(limit).all()
 
 def get_file(db: Session, file_id: str):
-    return db.query(models.File).filter(models.File.id == file_id).first()
+    return db.get(models.File, file_id)
 
 def delete_file(db: Session, file_id: str):
-    db.query(models.File).filter(models.File.id == file_id).delete()
+    file_path = db.scalar(delete(models.File).where(models.File.id == file_id).returning(models.File.path))
     db.commit()
-    return True
\ No newline at end of file
+    return file_path
+
+# Returns {path: id} for the rows actually inserted.
+# Leaves the commit to the caller's transaction
+def create_files(db: Session, files: list[dict]):
+    return dict(db.execute(
+        insert_files_skipping_known_paths(db).returning(models.File.path, models.File.id), files
+    ).all())
+
+def get_paths_by_sha256(db: Session, digests: list[str]):
+    return db.execute(select(models.File.sha256, models.File.path).where(models.File.sha256.in_(digests))).all()
+
+def delete_files(db: Session, file_ids: list[str]):
+    deleted_files = db.execute(
+        delete(models.File).where(models.File.id.in_(file_ids)).returning(models.File.id, models.File.path)
+    ).all()
+    db.commit()
+    return deleted_files
+
+# Leaves the commit to the caller's transaction
+def delete_files_created_before(db: Session, cutoff: datetime):
+    return db.scalars(
+        delete(models.File).where(models.File.created_at < cutoff).returning(models.File.path)
+    ).all()
+
+def get_existing_paths(db: Session, paths: list[str]):
+    return set(db.scalars(select(models.File.path).where(models.File.path.in_(paths))))
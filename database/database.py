@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 # from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
@@ -9,7 +9,23 @@ load_dotenv()
 # SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 SQLALCHEMY_DATABASE_URL = os.getenv("POSTGRES_DB_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Let psycopg2 batch executemany() calls instead of sending one statement per row,
+# and have the server cancel any statement that runs longer than 30 seconds
+engine_options = {}
+if make_url(SQLALCHEMY_DATABASE_URL).get_driver_name() == "psycopg2":
+    engine_options["executemany_mode"] = "values_plus_batch"
+    engine_options["connect_args"] = {"options": "-c statement_timeout=30000"}
+
+# Sessions borrow connections from this pool instead of opening a new one each time
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    **engine_options,
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
\ No newline at end of file
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -30,4 +32,14 @@ class User(UserBase):
     is_active: bool
     items: list[Item] = []
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class File(BaseModel):
+    id: str
+    filename: str
+    path: str
+    sha256: str | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
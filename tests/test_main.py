@@ -1,13 +1,15 @@
 from fastapi.testclient import TestClient
 from app.main import app
+from app.queue import startup_event, shutdown_event
 import pytest
 import random
 import string
 import json
+import hashlib
+import os
+import time
 from typing import Dict, Any, Annotated
 
-client = TestClient(app)
-
 # Custom TestClient to handle DELETE requests with payload
 class CustomTestClient(TestClient):
     """
@@ -24,12 +26,24 @@ class CustomTestClient(TestClient):
         delete_with_payload: Makes a DELETE request with a payload.
 
     Usage:
-        client = CustomTestClient(app)
+        client = CustomTestClient(app)  # or the session-scoped `client` fixture below
         response = client.delete_with_payload(url="/delete", json={"key": "value"})
     """
     def delete_with_payload(self,  **kwargs):
         return self.request(method="DELETE", **kwargs)
 
+# One client for the whole test session, so app startup and shutdown run once
+@pytest.fixture(scope="session")
+def client():
+    with CustomTestClient(app) as c:
+        yield c
+
+# Expected validation messages keyed by error type
+MSGS = {
+    "int_parsing": "Input should be a valid integer, unable to parse string as an integer",
+    "missing": "Field required",
+}
+
 # Helper function to return response based on the error type
 def response_helper(response: Any, query: str) -> Dict[str, Any]:
     """
@@ -42,71 +56,95 @@ def response_helper(response: Any, query: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: A formatted dictionary containing the response details.
     """
-    response_type = response.json()['detail'][0]['type']
-    response_loc = response.json()['detail'][0]['loc']
-    if response_type == "int_parsing":
-        return {'detail': [{'type': response_type, 'loc': response_loc, 'msg': 'Input should be a valid integer, unable to parse string as an integer', 'input': query}]}
-    elif response_type == "missing":
-        return {'detail': [{'type': response_type, 'loc': response_loc, 'msg': 'Field required', 'input': query}]}
+    detail = response.json()['detail'][0]
+    response_type = detail['type']
+    if response_type in MSGS:
+        return {'detail': [{'type': response_type, 'loc': detail['loc'], 'msg': MSGS[response_type], 'input': query}]}
+
+# Upload a file under a random name and wait for the upload consumer to record it.
+# Returns the file's row as listed by /files.
+def upload_and_wait(client: CustomTestClient, content: bytes, timeout: float = 5) -> Dict[str, Any]:
+    filename = ''.join(random.choices(string.ascii_lowercase, k=10)) + ".txt"
+    response = client.post("/upload-file/", files={"file": (filename, content)})
+    assert response.status_code == 200
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        rows = [row for row in client.get("/files?limit=1000").json() if row["filename"] == filename]
+        if rows:
+            return rows[0]
+        time.sleep(0.05)
+    raise AssertionError(f"{filename} was not recorded within {timeout}s")
 
 # Fixture to upload a file and return the file_id
-@pytest.fixture
-def file_id():
+@pytest.fixture(scope="module")
+def file_id(client):
     response = client.post("/upload-file/", files={"file": ("test.txt", b"file content")})
     assert response.status_code == 200
     uploaded_file = response.json()
     return uploaded_file["file_id"]
 
 # Test the root endpoint
-def test_read_root():
+def test_read_root(client):
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"Hello": "World"}
 
+# Test CORS preflight from an allowed localhost origin
+def test_cors_preflight_localhost(client):
+    response = client.options("/files", headers={"Origin": "http://localhost:8080", "Access-Control-Request-Method": "GET"})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "http://localhost:8080"
+
+# Test CORS preflight from an unknown origin
+def test_cors_preflight_unknown_origin(client):
+    response = client.options("/files", headers={"Origin": "http://example.com", "Access-Control-Request-Method": "GET"})
+    assert response.status_code == 400
+    assert "access-control-allow-origin" not in response.headers
+
 # Test the read_item endpoint
-def test_read_item():
+def test_read_item(client):
     response = client.get("/items/5")
     assert response.status_code == 200
     assert response.json() == {"item_id": 5, "q": None}
 
 # Test the read_item endpoint with query
-def test_read_item_with_query():
+def test_read_item_with_query(client):
     response = client.get("/items/5?q=test")
     assert response.status_code == 200
     assert response.json() == {"item_id": 5, "q": "test"}
 
 # Test the read_item endpoint with null id
-def test_read_item_with_null_id():
+def test_read_item_with_null_id(client):
     response = client.get("/items/null")
     assert response.status_code == 422
     assert response.json() == response_helper(response, "null")
 
 # Test the read_item endpoint without int id
-def test_read_item_without_intid():
+def test_read_item_without_intid(client):
     response = client.get("/items/abc")
     assert response.status_code == 422
     assert response.json() == response_helper(response, "abc")
 
 # Test the update_item endpoint
-def test_update_item(): 
+def test_update_item(client): 
     response = client.put("/items/5", json={"name": "test", "price": 10})
     assert response.status_code == 200
     assert response.json() == {"item_name": "test", "item_id": 5}
 
 # Test the update_item endpoint with null id
-def test_update_item_without_price():
+def test_update_item_without_price(client):
     response = client.put("/items/5", json={"name": "test"})
     assert response.status_code == 422
     assert response.json() == response_helper(response, {"name": "test"})
 
 # Test the update_item endpoint without name
-def test_update_item_without_name():
+def test_update_item_without_name(client):
     response = client.put("/items/5", json={"price": 10})
     assert response.status_code == 422
     assert response.json() == response_helper(response, {"price": 10})
 
 # Test the upload_file endpoint
-def test_upload_file():
+def test_upload_file(client):
     response = client.post("/upload-file/", files={"file": ("test.txt", b"file content")})
     assert response.status_code == 200
     response_data = response.json()
@@ -118,16 +156,58 @@ def test_upload_file():
     # assert response_data["file_extension"] == "txt"
     # assert response_data["file_size_kb"] == 0.01171875
 
+# Test an uploaded file is recorded by the upload consumer after the batch window
+def test_upload_file_recorded(client):
+    file = upload_and_wait(client, b"recorded content")
+    assert file["sha256"] == hashlib.sha256(b"recorded content").hexdigest()
+    with open(file["path"], "rb") as f:
+        assert f.read() == b"recorded content"
+
+# Test identical uploads get their own rows but share their bytes on disk
+def test_upload_file_duplicate_shares_inode(client):
+    first = upload_and_wait(client, b"same bytes")
+    second = upload_and_wait(client, b"same bytes")
+    assert first["id"] != second["id"]
+    assert first["path"] != second["path"]
+    assert os.stat(first["path"]).st_ino == os.stat(second["path"]).st_ino
+
+# Test shutdown records uploads that are still queued
+def test_upload_file_flushed_on_shutdown(client):
+    filename = ''.join(random.choices(string.ascii_lowercase, k=10)) + ".txt"
+    response = client.post("/upload-file/", files={"file": (filename, b"queued")})
+    assert response.status_code == 200
+    client.portal.call(shutdown_event)
+    try:
+        filenames = [row["filename"] for row in client.get("/files?limit=1000").json()]
+        assert filename in filenames
+    finally:
+        client.portal.call(startup_event)
 
 # Test get all files endpoint
-def test_get_all_files():
+def test_get_all_files(client):
     response = client.get("/files")
     assert response.status_code == 200
     response_data = response.json()
     assert isinstance(response_data, list)
 
+# Test get all files endpoint answers 304 for a matching ETag
+def test_get_all_files_not_modified(client):
+    response = client.get("/files")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    response = client.get("/files", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+# Test get all files endpoint with a limit above the cap
+def test_get_all_files_limit_too_large(client):
+    response = client.get("/files?limit=1001")
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "less_than_equal"
+
 # Test get file by id endpoint
-def test_get_file(file_id):
+def test_get_file(client, file_id):
     out, err = file_id.readouterr()
     print(out)
     response = client.get(f"/files/{out}")
@@ -137,34 +217,54 @@ def test_get_file(file_id):
     # assert response_data["path"] == "files/20240523-133250_test.txt"
     
 # Test get file by id endpoint
-def test_get_file_not_found():
+def test_get_file_not_found(client):
     response = client.get("/files/1")
     assert response.status_code == 404
     assert response.json() == {'detail': 'File not found'}
 
+# Test download file by id endpoint
+def test_download_file_not_found(client):
+    response = client.get("/files/1/download")
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'File not found'}
+
+# Test download file by id endpoint
+def test_download_file(client):
+    file = upload_and_wait(client, b"download me")
+    response = client.get(f"/files/{file['id']}/download")
+    assert response.status_code == 200
+    assert response.content == b"download me"
+    assert response.headers["content-disposition"] == f'attachment; filename="{file["filename"]}"'
+
+# Test download file by id endpoint when the row's file is gone from disk
+def test_download_file_missing_on_disk(client):
+    file = upload_and_wait(client, b"gone soon")
+    os.remove(file["path"])
+    response = client.get(f"/files/{file['id']}/download")
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'File not found'}
+
 # Test delete file by id endpoint
-def test_delete_file():
+def test_delete_file(client):
     response = client.delete("/files/fe049793-2be7-4c1b-a48c-e503ddb797dc")
     assert response.status_code == 404
     # assert response.status_code == 200
     # assert response.json() == {"message": "File deleted successfully"}
 
 # Test delete file by id endpoint
-def test_delete_file_not_found():
+def test_delete_file_not_found(client):
     response = client.delete("/files/1")
     assert response.status_code == 404
     assert response.json() == {'detail': 'File not found'}
 
 # Test multiple detele files endpoint
-def test_delete_files():
-    client = CustomTestClient(app)
+def test_delete_files(client):
     response = client.delete_with_payload(url="/files/", json=["fe049793-2be7-4c1b-a48c-e503ddb797dc"])
     assert response.status_code == 200 
     assert response.json() == [{"fe049793-2be7-4c1b-a48c-e503ddb797dc": "File not found"}]
 
 # Test multiple detele files endpoint
-def test_delete_files_not_found():
-    client = CustomTestClient(app)
+def test_delete_files_not_found(client):
     response = client.delete_with_payload(url="/files/", json=["1","4"])
     assert response.status_code == 200
     assert response.json() == [
@@ -178,7 +278,7 @@ def test_delete_files_not_found():
 
 # =========== USER & ITEMS ===========
 # Test the create_user endpoint
-def test_create_user():
+def test_create_user(client):
     email = ''.join(random.choices(string.ascii_lowercase, k=5)) + "@sahil"
     response = client.post("/users/", json={"email": email, "password": "test"})
     assert response.status_code == 200
@@ -190,20 +290,21 @@ def test_create_user():
     assert isinstance(response_data["id"], int) 
 
 # Test the create_user endpoint with missing email
-def test_create_user_duplicate_email():
+def test_create_user_duplicate_email(client):
     response = client.post("/users/", json={"email": "sahil", "password": "test"})
     assert response.status_code == 400
     assert response.json() == {'detail': 'Email already registered'}
 
 # Test the get_users endpoint
-def test_get_users():
+def test_get_users(client):
     response = client.get("/users/")
     assert response.status_code == 200
     response_data = response.json()
     assert isinstance(response_data, list)
+    assert all("items" in user for user in response_data)
 
 # Test the read_single_user endpoint
-def test_read_single_user():
+def test_read_single_user(client):
     response = client.get("/users/1")
     assert response.status_code == 200
     assert response.json() == {
@@ -221,13 +322,13 @@ def test_read_single_user():
     }
 
 # Test the read_single_user endpoint with invalid id
-def test_read_single_user_not_found():
+def test_read_single_user_not_found(client):
     response = client.get("/users/999")
     assert response.status_code == 404
     assert response.json() == {'detail': 'User not found'}
 
 # Test the create_user_item endpoint
-def test_create_user_item():
+def test_create_user_item(client):
     response = client.post("/users/2/items/", json={"title": "windows", "description": "intel"})
     assert response.status_code == 200
     response_data = response.json()
@@ -238,7 +339,7 @@ def test_create_user_item():
     assert response_data["owner_id"] == 2
 
 # Test the create_user_item endpoint with missing title
-def test_get_items():
+def test_get_items(client):
     response = client.get("/items/")
     assert response.status_code == 200
     response_data = response.json()
@@ -0,0 +1,113 @@
+# Housekeeping worker. Run exactly one of these next to the API workers:
+#
+#     python -m worker.main
+#
+# so the cleanup jobs run once per deployment instead of once per API worker.
+
+# apscheduler imports
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+# database imports
+from database.database import SessionLocal
+from database import crud, models
+
+# other imports
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app.storage import find_files_older_than, remove_file
+
+# The jobs below are plain functions on purpose: they talk to the database
+# through the synchronous SessionLocal, and AsyncIOScheduler runs non-async
+# jobs in a thread pool so they don't block its event loop.
+scheduler = AsyncIOScheduler()
+
+# Threads for overlapping unlinks, kept for the life of the worker so
+# every cleanup run doesn't have to start new ones
+unlink_executor = ThreadPoolExecutor(max_workers=16)
+
+# Uploads expire this long after they were recorded
+FILE_LIFETIME = datetime.timedelta(minutes=20)
+
+# Function to delete files older than 20 minutes, going by their rows
+def delete_old_files():
+    print("Searching for old files........")
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - FILE_LIFETIME
+    with SessionLocal.begin() as db:
+        file_paths = crud.delete_files_created_before(db, cutoff)
+    list(unlink_executor.map(remove_file, file_paths))
+    print(f"Deleted {len(file_paths)} old files")
+
+# Function to delete files on disk that no row points at (e.g. uploads whose
+# batch failed to insert, or leftover .tmp links), found with one directory
+# scan. Only files untouched for FILE_LIFETIME are considered, so uploads
+# still waiting for their row are left alone. Runs as its own job so a
+# problem with the upload directory can't hold up row expiry.
+def delete_orphaned_files():
+    print("Searching for orphaned files........")
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - FILE_LIFETIME
+    stale_paths = find_files_older_than(cutoff.timestamp())
+    if not stale_paths:
+        return
+    with SessionLocal() as db:
+        orphan_paths = set(stale_paths) - crud.get_existing_paths(db, stale_paths)
+    list(unlink_executor.map(remove_file, orphan_paths))
+    print(f"Deleted {len(orphan_paths)} orphaned files")
+
+# Function to trim users and items down to 10 rows each, in one transaction.
+# A kept item can still belong to a trimmed user, so the items of the
+# trimmed users are deleted too before the users themselves.
+def trim_excess():
+    print("Deleting excess users and items.......")
+    with SessionLocal.begin() as db:
+        crud.trim_table(db, models.Item, keep=10)
+        crud.delete_items_of_excess_users(db, keep=10)
+        crud.trim_table(db, models.User, keep=10)
+
+# Scheduler job that runs delete_old_files every 5 minutes
+scheduler.add_job(
+    delete_old_files,
+    trigger=IntervalTrigger(minutes=5),
+    id="delete_old_files",
+    name="Delete old files every 5 minutes",
+    replace_existing=True,
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=60,
+)
+
+# Scheduler job that runs delete_orphaned_files every 5 minutes
+scheduler.add_job(
+    delete_orphaned_files,
+    trigger=IntervalTrigger(minutes=5),
+    id="delete_orphaned_files",
+    name="Delete orphaned files every 5 minutes",
+    replace_existing=True,
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=60,
+)
+
+# Scheduler job that runs trim_excess every 10 minutes
+scheduler.add_job(
+    trim_excess,
+    trigger=IntervalTrigger(minutes=10),
+    id="trim_excess",
+    name="Delete excess users and items every 10 minutes",
+    replace_existing=True,
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=60,
+)
+
+# Start the scheduler and keep the process alive until it is stopped
+async def main():
+    scheduler.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        scheduler.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())